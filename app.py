@@ -1,8 +1,14 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import Response
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Iterator, Union
+from contextlib import asynccontextmanager
 import tempfile
 import os
-from pdf_enhancer import enhance_pdf_from_path
+import aiofiles
+import cv2
+from pdf_enhancer import enhance_pdf, start_page_pool, shutdown_page_pool, available_cpus
 from image_enhancer import enhance_image_from_path
 import logging
 
@@ -10,6 +16,20 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk in 1 MB chunks so memory use stays flat regardless of file size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Uploads up to 32 MB are kept in memory, only bigger ones are spilled to disk
+SPOOL_MAX_SIZE = 32 << 20
+
+# Responses are sent in 1 MB chunks so the client starts receiving right away
+RESPONSE_CHUNK_SIZE = 1 << 20
+
+# When uvicorn runs several worker processes, each one already keeps a core busy,
+# so OpenCV's internal thread pool would only make the workers fight over cores
+if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+    cv2.setNumThreads(1)
+
 ASCII_ART = """
  ███████╗ ██████╗ █████╗ ███╗   ██╗    ██████╗ ██╗███╗   ███╗██████╗ ██╗███╗   ██╗ ██████╗
  ██╔════╝██╔════╝██╔══██╗████╗  ██║    ██╔══██╗██║████╗ ████║██╔══██╗██║████╗  ██║██╔════╝
@@ -20,12 +40,179 @@ ASCII_ART = """
                                                                                               
 """
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the PDF page workers (if pages run in a pool) before the first request, stop them on shutdown"""
+    await run_in_threadpool(start_page_pool)
+    yield
+    shutdown_page_pool()
+
 app = FastAPI(
     title="Scan-Pimping API",
     description="🚀 Pimp your scanned PDFs! Straighten pages, enhance contrast, and make documents look professional",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+async def save_upload_to_temp(file: UploadFile, suffix: str) -> str:
+    """
+    Stream an uploaded file into a new temporary file, one chunk at a time.
+    
+    Args:
+        file: Uploaded file to save
+        suffix: File extension for the temporary file (e.g. '.pdf')
+    
+    Returns:
+        Path to the temporary file (the caller is responsible for deleting it)
+    """
+    async def upload_chunks():
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+    
+    return await save_stream_to_temp(upload_chunks(), suffix)
+
+async def save_stream_to_temp(chunks: AsyncIterator[bytes], suffix: str) -> str:
+    """
+    Write an async stream of byte chunks into a new temporary file.
+    
+    Args:
+        chunks: Async iterator of byte chunks (e.g. request.stream())
+        suffix: File extension for the temporary file (e.g. '.pdf')
+    
+    Returns:
+        Path to the temporary file (the caller is responsible for deleting it)
+    """
+    fd, temp_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    
+    try:
+        async with aiofiles.open(temp_path, 'wb') as out:
+            async for chunk in chunks:
+                await out.write(chunk)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    
+    return temp_path
+
+async def spool_upload(file: UploadFile, suffix: str) -> Union[bytes, str]:
+    """
+    Collect an uploaded file, in memory while it is small enough.
+    
+    Args:
+        file: Uploaded file to collect
+        suffix: File extension for the temporary file if it spills over (e.g. '.pdf')
+    
+    Returns:
+        The file content as bytes, or the path to a temporary file if it was
+        bigger than SPOOL_MAX_SIZE (the caller is responsible for deleting it)
+    """
+    async def upload_chunks():
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+    
+    return await spool_stream(upload_chunks(), suffix)
+
+async def spool_stream(chunks: AsyncIterator[bytes], suffix: str) -> Union[bytes, str]:
+    """
+    Collect an async stream of byte chunks, in memory while it is small enough.
+    
+    Works like tempfile.SpooledTemporaryFile: everything stays in RAM up to
+    SPOOL_MAX_SIZE and only bigger streams spill over into a temporary file.
+    Unlike SpooledTemporaryFile, the spilled file has a path we can hand to
+    the PDF pipeline, and it is written without blocking the event loop.
+    
+    Args:
+        chunks: Async iterator of byte chunks (e.g. request.stream())
+        suffix: File extension for the temporary file if it spills over (e.g. '.pdf')
+    
+    Returns:
+        The data as bytes, or the path to a temporary file if it was bigger
+        than SPOOL_MAX_SIZE (the caller is responsible for deleting it)
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        if len(buffer) > SPOOL_MAX_SIZE:
+            break
+    else:
+        # Small enough - no disk I/O at all
+        return bytes(buffer)
+    
+    # Too big for memory: write what we have so far, then the rest of the stream
+    async def spilled_chunks():
+        yield bytes(buffer)
+        buffer.clear()
+        async for chunk in chunks:
+            yield chunk
+    
+    return await save_stream_to_temp(spilled_chunks(), suffix)
+
+def iter_bytes_chunks(data: bytes) -> Iterator[bytes]:
+    """
+    Yield an in-memory result in RESPONSE_CHUNK_SIZE pieces.
+    
+    Args:
+        data: Bytes to send
+    """
+    for start in range(0, len(data), RESPONSE_CHUNK_SIZE):
+        yield data[start:start + RESPONSE_CHUNK_SIZE]
+
+def iter_file_chunks(path: str) -> Iterator[bytes]:
+    """
+    Yield a file in RESPONSE_CHUNK_SIZE pieces.
+    
+    Deleting a temporary file is left to the response's background task,
+    which also runs when the body is never read (e.g. the client went away).
+    
+    Args:
+        path: Path to the file to send
+    """
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(RESPONSE_CHUNK_SIZE), b'')
+
+async def pimp_spooled_pdf(pdf_source: Union[bytes, str], filename: str, dpi: int) -> StreamingResponse:
+    """
+    Enhance a PDF collected by spool_upload() / spool_stream().
+    
+    If the PDF spilled over into a temporary file, that file is deleted once
+    the PDF has been processed.
+    
+    Args:
+        pdf_source: PDF content as bytes, or path to the temporary file
+        filename: Original filename, used to name the pimped PDF
+        dpi: Scan quality (72-600 DPI)
+    
+    Returns:
+        Pimped PDF as streamed binary response
+    """
+    logger.info(f"🔥 PIMPING PDF: {filename} with DPI: {dpi}")
+    
+    try:
+        # Process the PDF - the result is built in memory, no output file needed
+        # Runs in a worker thread so the server keeps answering other requests
+        pdf_bytes = await run_in_threadpool(enhance_pdf, pdf_source, dpi)
+    finally:
+        # Clean up temporary input file (only big uploads have one)
+        if isinstance(pdf_source, str):
+            os.unlink(pdf_source)
+    
+    logger.info(f"✨ Successfully pimped PDF: {filename}")
+    
+    # Generate output filename with "_pimped" before extension
+    base_name, ext = os.path.splitext(filename)
+    pimped_filename = f"{base_name}_pimped{ext}"
+    
+    # Stream the pimped PDF back as binary response
+    return StreamingResponse(
+        iter_bytes_chunks(pdf_bytes),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={pimped_filename}",
+            "Content-Length": str(len(pdf_bytes))
+        }
+    )
+
 @app.get("/")
 async def root():
     """Welcome endpoint with ASCII art"""
@@ -36,6 +223,7 @@ async def root():
         "endpoints": {
             "enhance": "POST /pimp - Upload any file (PDF/Image) and get enhanced version! 🔥",
             "enhance_pdf": "POST /pimp-pdf - Upload and enhance your PDF",
+            "enhance_pdf_stream": "POST /pimp-pdf/stream - Send a raw PDF body (no multipart) and get it enhanced",
             "enhance_image": "POST /pimp-image - Upload and enhance your image",
             "health": "GET /health - Health check",
             "docs": "GET /docs - API documentation"
@@ -69,56 +257,57 @@ async def pimp_pdf_endpoint(
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
     try:
-        # Create temporary files for input and output
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_input:
-            # Save uploaded file
-            content = await file.read()
-            temp_input.write(content)
-            temp_input.flush()
-            
-            logger.info(f"🔥 PIMPING PDF: {file.filename} with DPI: {dpi}")
-            
-            # Create output temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_output:
-                # Process the PDF using our simplified function
-                enhance_pdf_from_path(temp_input.name, temp_output.name, dpi)
-                
-                # Read the pimped PDF
-                with open(temp_output.name, 'rb') as pimped_pdf:
-                    pdf_bytes = pimped_pdf.read()
-                
-                # Clean up temporary files
-                os.unlink(temp_input.name)
-                os.unlink(temp_output.name)
-                
-                logger.info(f"✨ Successfully pimped PDF: {file.filename}")
-                
-                # Generate output filename with "_pimped" before extension
-                base_name, ext = os.path.splitext(file.filename)
-                pimped_filename = f"{base_name}_pimped{ext}"
-                
-                # Return the pimped PDF as binary response
-                return Response(
-                    content=pdf_bytes,
-                    media_type="application/pdf",
-                    headers={
-                        "Content-Disposition": f"attachment; filename={pimped_filename}"
-                    }
-                )
+        # Keep the upload in memory, only big PDFs go through a temporary file
+        pdf_source = await spool_upload(file, '.pdf')
+        
+        return await pimp_spooled_pdf(pdf_source, file.filename, dpi)
                 
     except Exception as e:
-        # Clean up temporary files in case of error
-        try:
-            if 'temp_input' in locals():
-                os.unlink(temp_input.name)
-            if 'temp_output' in locals():
-                os.unlink(temp_output.name)
-        except:
-            pass
-        
         logger.error(f"Error processing PDF {file.filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
 
+@app.post("/pimp-pdf/stream")
+async def pimp_pdf_stream_endpoint(
+    request: Request,
+    dpi: int = Query(200, description="Scan quality (DPI) - Higher = Better!", ge=72, le=600),
+    filename: str = Query("document.pdf", description="Original filename, used to name the pimped PDF")
+):
+    """
+    🔥 PIMP YOUR PDF - STREAMING EDITION! 🔥
+    
+    Same as /pimp-pdf, but the request body is the raw PDF itself instead of
+    a multipart form. The body is collected as it arrives (in memory, or on
+    disk for big files), skipping the multipart parser and its intermediate
+    spool file - the fastest way to send big PDFs.
+    
+    Example:
+        curl -X POST "http://localhost:8000/pimp-pdf/stream?dpi=200&filename=scan.pdf" \
+             -H "Content-Type: application/pdf" \
+             --data-binary @scan.pdf --output scan_pimped.pdf
+    
+    Args:
+        request: Raw request, its body is the PDF file
+        dpi: Scan quality (72-600 DPI) - Higher values = better quality
+        filename: Original filename, used to name the pimped PDF
+    
+    Returns:
+        Pimped PDF as binary response, ready to impress! ✨
+    """
+    
+    # Validate file type
+    if not filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    
+    try:
+        # Keep the body in memory, only big PDFs go through a temporary file
+        pdf_source = await spool_stream(request.stream(), '.pdf')
+        
+        return await pimp_spooled_pdf(pdf_source, filename, dpi)
+        
+    except Exception as e:
+        logger.error(f"Error processing PDF {filename}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
+
 @app.post("/pimp-image")
 async def pimp_image_endpoint(
     file: UploadFile = File(..., description="Image file to pimp up! 🔥"),
@@ -165,64 +354,63 @@ async def pimp_image_endpoint(
         input_suffix = f'.{file_ext}'
         output_suffix = f'.{file_ext}'
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=input_suffix) as temp_input:
-            # Save uploaded file
-            content = await file.read()
-            temp_input.write(content)
-            temp_input.flush()
+        # Stream the uploaded file to disk without holding it in memory
+        temp_input_path = await save_upload_to_temp(file, input_suffix)
+        
+        logger.info(f"🔥 PIMPING IMAGE: {file.filename} with threshold: {area_threshold}, upscale: {upscale_factor}x")
+        
+        # Create output temporary file
+        with tempfile.NamedTemporaryFile(delete=False, suffix=output_suffix) as temp_output:
+            # Process the image using our enhancement function
+            # Runs in a worker thread so the server keeps answering other requests
+            await run_in_threadpool(
+                enhance_image_from_path,
+                temp_input_path,
+                temp_output.name,
+                area_threshold,
+                upscale_factor,
+                quality
+            )
             
-            logger.info(f"🔥 PIMPING IMAGE: {file.filename} with threshold: {area_threshold}, upscale: {upscale_factor}x")
+            # Clean up temporary input file
+            # (the output file is deleted after the response, see below)
+            os.unlink(temp_input_path)
             
-            # Create output temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=output_suffix) as temp_output:
-                # Process the image using our enhancement function
-                enhance_image_from_path(
-                    temp_input.name,
-                    temp_output.name,
-                    area_threshold,
-                    upscale_factor,
-                    quality
-                )
-                
-                # Read the pimped image
-                with open(temp_output.name, 'rb') as pimped_image:
-                    image_bytes = pimped_image.read()
-                
-                # Clean up temporary files
-                os.unlink(temp_input.name)
-                os.unlink(temp_output.name)
-                
-                logger.info(f"✨ Successfully pimped image: {file.filename}")
-                
-                # Generate output filename with "_pimped" before extension
-                base_name, ext = os.path.splitext(file.filename)
-                pimped_filename = f"{base_name}_pimped{ext}"
-                
-                # Determine media type based on file extension
-                media_type_map = {
-                    'png': 'image/png',
-                    'jpg': 'image/jpeg',
-                    'jpeg': 'image/jpeg',
-                    'bmp': 'image/bmp',
-                    'tiff': 'image/tiff',
-                    'tif': 'image/tiff'
-                }
-                media_type = media_type_map.get(file_ext, 'application/octet-stream')
-                
-                # Return the pimped image as binary response
-                return Response(
-                    content=image_bytes,
-                    media_type=media_type,
-                    headers={
-                        "Content-Disposition": f"attachment; filename={pimped_filename}"
-                    }
-                )
+            logger.info(f"✨ Successfully pimped image: {file.filename}")
+            
+            # Generate output filename with "_pimped" before extension
+            base_name, ext = os.path.splitext(file.filename)
+            pimped_filename = f"{base_name}_pimped{ext}"
+            
+            # Determine media type based on file extension
+            media_type_map = {
+                'png': 'image/png',
+                'jpg': 'image/jpeg',
+                'jpeg': 'image/jpeg',
+                'bmp': 'image/bmp',
+                'tiff': 'image/tiff',
+                'tif': 'image/tiff'
+            }
+            media_type = media_type_map.get(file_ext, 'application/octet-stream')
+            
+            # Stream the pimped image back as binary response
+            # (the output file is deleted by the background task once the
+            # response is finished)
+            return StreamingResponse(
+                iter_file_chunks(temp_output.name),
+                media_type=media_type,
+                headers={
+                    "Content-Disposition": f"attachment; filename={pimped_filename}",
+                    "Content-Length": str(os.path.getsize(temp_output.name))
+                },
+                background=BackgroundTask(os.unlink, temp_output.name)
+            )
                 
     except Exception as e:
         # Clean up temporary files in case of error
         try:
-            if 'temp_input' in locals():
-                os.unlink(temp_input.name)
+            if 'temp_input_path' in locals():
+                os.unlink(temp_input_path)
             if 'temp_output' in locals():
                 os.unlink(temp_output.name)
         except:
@@ -296,4 +484,11 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # One worker process per usable CPU core by default, override with
+    # WEB_CONCURRENCY (set in the environment so the worker processes can see
+    # it too)
+    workers = int(os.environ.setdefault("WEB_CONCURRENCY", str(available_cpus())))
+    # uvloop (event loop) and httptools (HTTP parser) are the fast C/Cython
+    # implementations shipped with uvicorn[standard]
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=workers,
+                loop="uvloop", http="httptools")
\ No newline at end of file
@@ -6,14 +6,128 @@
 import fitz  # PyMuPDF - for PDF manipulation and rendering
 import cv2   # OpenCV - for computer vision and image processing
 import numpy as np  # NumPy - for numerical operations on image arrays
-from PIL import Image  # Pillow - for image format conversion and saving
 import os             # OS operations for file handling
+import io             # In-memory byte buffers for PDF output
+import tempfile       # For handing in-memory PDFs to the page workers
+import threading      # For per-thread scratch buffers
+import math           # For fast scalar math on corner points
+import multiprocessing  # For picking a safe way to start worker processes
+from concurrent.futures import ProcessPoolExecutor  # For processing pages in parallel
+from concurrent.futures.process import BrokenProcessPool  # Raised when a page worker dies
+from image_enhancer import scratch_buffer  # Per-thread scratch arrays for process_image_cv
+from image_enhancer import USE_CUDA, upscale_and_threshold_cuda  # Opt-in NVIDIA GPU path
+from image_enhancer import USE_OPENCL, upscale_and_threshold_opencl  # Opt-in OpenCL GPU path
 
 # =============================================================================
 # PDF TO IMAGES CONVERSION
 # =============================================================================
 
-def pdf_to_images_in_memory(pdf_path, dpi=200):
+# PyMuPDF must not be used from several threads at once, but the API runs
+# enhance_pdf() in a thread pool - every PyMuPDF call in this process goes
+# through this lock (re-entrant, so helpers can nest)
+_fitz_lock = threading.RLock()
+
+def open_pdf(pdf_source):
+    """
+    🔥 OPENS A PDF FROM DISK OR FROM MEMORY
+    
+    Args:
+        pdf_source (str or bytes): Full path to the input PDF file,
+                                   or the raw bytes of the PDF
+    
+    Returns:
+        fitz.Document: The opened PDF (the caller is responsible for closing it)
+    
+    Raises:
+        Exception: If the PDF cannot be opened
+    """
+    try:
+        # Open the PDF document using PyMuPDF (from memory or from disk)
+        with _fitz_lock:
+            if isinstance(pdf_source, (bytes, bytearray)):
+                return fitz.open(stream=pdf_source, filetype="pdf")
+            return fitz.open(pdf_source)
+    except Exception as e:
+        # If anything goes wrong, raise a standard exception
+        raise Exception(f"Failed to read PDF. Error: {e}")
+
+def close_pdf(doc):
+    """
+    🔥 CLOSES A PDF OPENED WITH open_pdf()
+    
+    Args:
+        doc (fitz.Document): The PDF to close
+    """
+    with _fitz_lock:
+        doc.close()
+
+def pdf_page_count(doc):
+    """
+    🔥 NUMBER OF PAGES IN A PDF OPENED WITH open_pdf()
+    
+    Args:
+        doc (fitz.Document): The opened PDF
+    
+    Returns:
+        int: Number of pages
+    """
+    with _fitz_lock:
+        return len(doc)
+
+def iter_pdf_pages(doc, dpi=200, start=0, stop=None):
+    """
+    🔥 RENDERS PDF PAGES TO IMAGE ARRAYS, ONE AT A TIME
+    
+    Generator version of pdf_to_images_in_memory(): each page is rendered only
+    when it is asked for, so pages can be processed while later ones are still
+    being rendered, and never all sit in memory at once.
+    
+    Args:
+        doc (fitz.Document): PDF opened with open_pdf()
+        dpi (int): Dots per inch - higher values = better quality but larger files
+                  Typical values: 72 (screen), 150 (draft), 200 (good), 300+ (high quality)
+        start (int): Index of the first page to render (default: 0)
+        stop (int): Index after the last page to render (default: end of the PDF)
+    
+    Yields:
+        numpy.array: One page as an image, in page order
+                     Format: [height, width] (grayscale)
+    
+    Raises:
+        Exception: If a page cannot be rendered
+    """
+    # Process each page in the PDF (or in the requested range)
+    for i in range(start, pdf_page_count(doc) if stop is None else stop):
+        # Only the PyMuPDF part holds the lock - the page is processed
+        # by the caller after it is released
+        with _fitz_lock:
+            try:
+                # Load the current page
+                page = doc.load_page(i)
+                
+                # Render the page to a pixmap (bitmap) at specified DPI
+                # Higher DPI = better quality but more memory usage
+                # The output is black and white, so PyMuPDF renders straight to
+                # single-channel grayscale without alpha - a third of the pixels
+                # to produce, and no color conversion pass afterwards
+                pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+            except Exception as e:
+                # If anything goes wrong, raise a standard exception
+                raise Exception(f"Failed to read PDF. Error: {e}")
+            
+            # Convert pixmap to numpy array for OpenCV processing
+            # pix.samples contains raw pixel data as bytes - a copy that stays
+            # valid after the pixmap is freed (a zero-copy view of
+            # pix.samples_mv would not, and would save only one memcpy per page)
+            # We reshape it to [height, width] format
+            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+            
+            # Free the PyMuPDF objects while still holding the lock
+            del page, pix
+        
+        yield img
+
+def pdf_to_images_in_memory(pdf_source, dpi=200):
     """
     🔥 CONVERTS PDF PAGES TO IMAGE ARRAYS IN MEMORY
     
@@ -21,52 +135,24 @@ def pdf_to_images_in_memory(pdf_path, dpi=200):
     representing the image data. This is the first step in our pimping process!
     
     Args:
-        pdf_path (str): Full path to the input PDF file
+        pdf_source (str or bytes): Full path to the input PDF file,
+                                   or the raw bytes of the PDF
         dpi (int): Dots per inch - higher values = better quality but larger files
                   Typical values: 72 (screen), 150 (draft), 200 (good), 300+ (high quality)
     
     Returns:
         list: List of numpy arrays, each representing a page as an image
-              Format: [height, width, channels] where channels = 3 (BGR color)
+              Format: [height, width] (grayscale)
     
     Raises:
-        gr.Error: If PDF cannot be read or processed
+        Exception: If PDF cannot be read or processed
     """
+    doc = open_pdf(pdf_source)
     try:
-        # Open the PDF document using PyMuPDF
-        doc = fitz.open(pdf_path)
-        images = []
-        
-        # Process each page in the PDF
-        for i in range(len(doc)):
-            # Load the current page
-            page = doc.load_page(i)
-            
-            # Render the page to a pixmap (bitmap) at specified DPI
-            # Higher DPI = better quality but more memory usage
-            pix = page.get_pixmap(dpi=dpi)
-            
-            # Convert pixmap to numpy array for OpenCV processing
-            # pix.samples contains raw pixel data as bytes
-            # We reshape it to [height, width, channels] format
-            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-            
-            # Handle color space conversion if needed
-            if pix.n == 4:  # RGBA format (Red, Green, Blue, Alpha)
-                # Convert BGRA to BGR (remove alpha channel)
-                # OpenCV uses BGR color order, not RGB
-                img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            
-            # Add the processed page image to our list
-            images.append(img)
-        
+        return list(iter_pdf_pages(doc, dpi))
+    finally:
         # Close the PDF document to free memory
-        doc.close()
-        return images
-        
-    except Exception as e:
-        # If anything goes wrong, raise a standard exception
-        raise Exception(f"Failed to read PDF. Error: {e}")
+        close_pdf(doc)
 
 
 # =============================================================================
@@ -83,8 +169,8 @@ def distance(p1, p2):
     the length of document edges for perspective correction.
     
     Args:
-        p1 (numpy.array): First point [x, y]
-        p2 (numpy.array): Second point [x, y]
+        p1 (numpy.array or list): First point [x, y]
+        p2 (numpy.array or list): Second point [x, y]
     
     Returns:
         float: Distance between the two points in pixels
@@ -92,7 +178,8 @@ def distance(p1, p2):
     Example:
         distance([0, 0], [3, 4]) returns 5.0 (classic 3-4-5 triangle)
     """
-    return np.linalg.norm(p1 - p2)
+    # math.hypot on two scalars skips np.linalg.norm's array dispatch entirely
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
 def order_rect(pts):
     """
@@ -111,23 +198,30 @@ def order_rect(pts):
     Algorithm:
         - Top-left: smallest sum of x+y coordinates
         - Bottom-right: largest sum of x+y coordinates
-        - Top-right: smallest difference of x-y coordinates
-        - Bottom-left: largest difference of x-y coordinates
+        - Top-right: smallest difference of y-x coordinates
+        - Bottom-left: largest difference of y-x coordinates
+    """
+    return np.array(_order_corners(pts.tolist()), dtype="float32")
+
+def _order_corners(points):
     """
-    # Initialize array to hold ordered rectangle points
-    rect = np.zeros((4, 2), dtype="float32")
+    Plain-Python core of order_rect(): takes and returns lists of [x, y].
     
+    With only 4 points, plain Python numbers are faster than a handful of
+    NumPy reductions (each NumPy call costs more than the math itself).
+    """
     # Calculate sum and difference for each point
-    s = pts.sum(axis=1)      # x + y for each point
-    diff = np.diff(pts, axis=1)  # x - y for each point
+    s = [x + y for x, y in points]     # x + y for each point
+    diff = [y - x for x, y in points]  # y - x for each point
+    indices = range(4)
 
     # Find corners based on mathematical properties:
-    rect[0] = pts[np.argmin(s)]    # Top-left: smallest x+y
-    rect[2] = pts[np.argmax(s)]    # Bottom-right: largest x+y
-    rect[1] = pts[np.argmin(diff)] # Top-right: smallest x-y
-    rect[3] = pts[np.argmax(diff)] # Bottom-left: largest x-y
-    
-    return rect
+    return [
+        points[min(indices, key=s.__getitem__)],     # Top-left: smallest x+y
+        points[min(indices, key=diff.__getitem__)],  # Top-right: smallest y-x
+        points[max(indices, key=s.__getitem__)],     # Bottom-right: largest x+y
+        points[max(indices, key=diff.__getitem__)]   # Bottom-left: largest y-x
+    ]
 
 def four_point_transform(image, pts):
     """
@@ -150,21 +244,25 @@ def four_point_transform(image, pts):
         3. Create a perspective transformation matrix
         4. Apply the transformation to straighten the document
     """
-    # Get the corners in the right order
-    rect = order_rect(pts)
-    (tl, tr, br, bl) = rect  # top-left, top-right, bottom-right, bottom-left
+    # Get the corners in the right order, as plain (x, y) numbers:
+    # top-left, top-right, bottom-right, bottom-left
+    corners = _order_corners(pts.tolist())
+    ((tl_x, tl_y), (tr_x, tr_y), (br_x, br_y), (bl_x, bl_y)) = corners
+
+    # Edge lengths are computed inline with math.hypot on the unpacked floats
+    # (same math as distance(), without re-indexing the points)
 
     # Calculate the width of the straightened document
     # We measure both the top and bottom edges and take the maximum
     # This ensures we don't lose any content due to perspective distortion
-    widthA = distance(br, bl)  # Bottom edge length
-    widthB = distance(tr, tl)  # Top edge length
+    widthA = math.hypot(br_x - bl_x, br_y - bl_y)  # Bottom edge length
+    widthB = math.hypot(tr_x - tl_x, tr_y - tl_y)  # Top edge length
     maxWidth = int(max(widthA, widthB))
 
     # Calculate the height of the straightened document
     # We measure both the left and right edges and take the maximum
-    heightA = distance(tr, br)  # Right edge length
-    heightB = distance(tl, bl)  # Left edge length
+    heightA = math.hypot(tr_x - br_x, tr_y - br_y)  # Right edge length
+    heightB = math.hypot(tl_x - bl_x, tl_y - bl_y)  # Left edge length
     maxHeight = int(max(heightA, heightB))
 
     # Define where we want the corners to end up in the straightened image
@@ -179,19 +277,68 @@ def four_point_transform(image, pts):
 
     # Calculate the perspective transformation matrix
     # This matrix defines how to map the crooked corners to straight corners
+    # (the only two NumPy arrays built here are the ones OpenCV needs)
+    rect = np.array(corners, dtype="float32")
     M = cv2.getPerspectiveTransform(rect, dst)
     
     # Apply the transformation to straighten the document
     # This is where the magic happens - crooked becomes straight!
-    warped = cv2.warpPerspective(image, M, (maxWidth, maxHeight))
+    # INTER_LINEAR on uint8 images runs on OpenCV's fixed-point integer path
+    warped = cv2.warpPerspective(image, M, (maxWidth, maxHeight), flags=cv2.INTER_LINEAR)
     
     return warped
 
+def axis_aligned_box(pts, width, height, tolerance):
+    """
+    🔥 CHECKS IF A DOCUMENT IS ALREADY STRAIGHT IN THE IMAGE
+    
+    When the detected corners form a rectangle whose edges run along the
+    image axes (typical for flatbed scans), the perspective correction would
+    be (almost) a plain crop - so we can crop instead and skip the expensive
+    full-image warp.
+    
+    Args:
+        pts (numpy.array): Four corner points of the document
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        tolerance (float): How far (in pixels) matching corners may be off
+                           the same row or column
+    
+    Returns:
+        tuple or None: (x0, y0, x1, y1) inclusive crop box inside the image,
+                       or None if the document is tilted or in perspective
+    """
+    ((tl_x, tl_y), (tr_x, tr_y), (br_x, br_y), (bl_x, bl_y)) = _order_corners(pts.tolist())
+    
+    # Top and bottom edges must be horizontal, left and right edges vertical
+    if (abs(tl_y - tr_y) > tolerance or abs(bl_y - br_y) > tolerance
+            or abs(tl_x - bl_x) > tolerance or abs(tr_x - br_x) > tolerance):
+        return None
+    
+    # Keep the inner box, so no background sneaks in along the edges
+    x0 = max(0, math.ceil(max(tl_x, bl_x)))
+    y0 = max(0, math.ceil(max(tl_y, tr_y)))
+    x1 = min(width - 1, math.floor(min(tr_x, br_x)))
+    y1 = min(height - 1, math.floor(min(bl_y, br_y)))
+    return x0, y0, x1, y1
+
 # =============================================================================
 # CORE IMAGE PROCESSING ENGINE
 # This is the heart of our pimping process! 🔥
 # =============================================================================
 
+# Make sure OpenCV picks its SIMD-optimized kernels (resize, threshold, ...)
+# It is on by default, but some builds or embedding apps switch it off
+cv2.setUseOptimized(True)
+
+# Longest side (in pixels) of the thumbnail used to detect the document outline
+DETECTION_MAX_SIDE = 1000
+
+# The per-thread scratch buffers (scratch_buffer) and the GPU paths
+# (USE_CUDA, USE_OPENCL and their upscale_and_threshold_* helpers) are
+# shared with image_enhancer and imported at the top of this module -
+# OpenCL is switched on there, once per process
+
 def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     """
     🔥 THE MAIN PIMPING FUNCTION - TRANSFORMS SCANNED IMAGES INTO MASTERPIECES!
@@ -203,7 +350,8 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     4. Creates a clean, professional black-and-white output
     
     Args:
-        image (numpy.array): Input image as BGR color array [height, width, 3]
+        image (numpy.array): Input image, grayscale [height, width]
+                             or BGR color [height, width, 3]
         area_threshold_ratio (float): Minimum document size as fraction of total image
                                     (0.4 = document must be at least 40% of image area)
         upscale_factor (int): How much to enlarge the final image (2 = double size)
@@ -215,7 +363,8 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     Process Overview:
         INPUT: Crooked, low-contrast scanned page
         ↓
-        STEP 1: Blur and edge detection to find document outline
+        STEP 1: Convert to grayscale, then blur and edge detection (on a
+                thumbnail) to find document outline
         ↓
         STEP 2: Find the largest rectangular contour (the document)
         ↓
@@ -230,21 +379,48 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     
     # Get image dimensions for calculations
     img_height, img_width = image.shape[:2]
-    img_area = img_height * img_width  # Total pixel area
     
     # =================================================================
     # STEP 1: PRE-PROCESSING FOR EDGE DETECTION
     # =================================================================
     
+    # Convert to grayscale for black-and-white processing
+    # This removes color information, focusing on text and content
+    # Every step below only needs brightness, so doing this first means
+    # the thumbnail, the warp and the upscale all move 1 channel instead of 3
+    # (grayscale input - e.g. PDF pages rendered in gray - is used as-is)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY,
+                             dst=scratch_buffer('gray', (img_height, img_width)))
+    
+    # Finding the document outline only needs coarse geometry, so we detect
+    # it on a small thumbnail (at most 1000 px on the long side) instead of
+    # the full-resolution page. The straightening in STEP 3 still uses every
+    # pixel of the original image.
+    # scale = how many full-resolution pixels one thumbnail pixel covers
+    scale = max(1.0, max(img_height, img_width) / DETECTION_MAX_SIDE)
+    if scale > 1:
+        small = cv2.resize(image, None, fx=1 / scale, fy=1 / scale,
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = image
+    small_area = small.shape[0] * small.shape[1]  # Thumbnail pixel area
+    
+    # Intermediate images are written into reusable scratch buffers
+    small_shape = small.shape[:2]
+    
     # Apply Gaussian blur to reduce noise and smooth the image
     # This helps edge detection work better by removing small details
     # Kernel size (5,5) is a good balance - not too blurry, removes enough noise
-    blurred = cv2.GaussianBlur(image, (5, 5), 0)
+    # Canny itself does not smooth (it goes straight to Sobel gradients), and
+    # on the single-channel thumbnail this blur costs well under a millisecond
+    blurred = cv2.GaussianBlur(small, (5, 5), 0,
+                               dst=scratch_buffer('blurred', small_shape))
     
     # Detect edges using Canny edge detector
     # Low threshold: 10 (weak edges), High threshold: 50 (strong edges)
     # This finds the outlines of objects, including our document borders
-    edges = cv2.Canny(blurred, 10, 50)
+    edges = cv2.Canny(blurred, 10, 50, edges=scratch_buffer('edges', small_shape))
     
     # =================================================================
     # STEP 2: FIND THE DOCUMENT CONTOUR
@@ -253,15 +429,26 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     # Find all contours (connected edge pixels) in the edge image
     # RETR_EXTERNAL: only get outer contours (ignore holes inside shapes)
     # CHAIN_APPROX_SIMPLE: compress contours by removing redundant points
+    # (the TC89 approximations return even fewer points, but computing them
+    # made this call ~2x slower on a noisy scan - and this call is where the
+    # time goes, not in the area filtering below)
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
-    # Sort contours by area (largest first)
+    # Keep only the contours big enough to be the document
+    # (at least 40% of image area by default), computing each area once
+    # On a cluttered scan this drops the hundreds of small edge blobs
+    # before any sorting - with RETR_EXTERNAL the outer contours don't
+    # overlap, so in practice only one or two of them pass
+    min_area = area_threshold_ratio * small_area
+    candidates = [(area, c) for c in contours if (area := cv2.contourArea(c)) > min_area]
+    
+    # Sort the candidates by area (largest first)
     # The document should be the largest rectangular object in the image
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
     
     # Look for the document contour (should be rectangular with 4 corners)
     screenCnt = None
-    for c in contours:
+    for _, c in candidates:
         # Calculate the perimeter of this contour
         peri = cv2.arcLength(c, True)
         
@@ -272,17 +459,32 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
         
         # Check if this looks like a document:
         # 1. Must have exactly 4 corners (rectangular)
-        # 2. Must be large enough (at least 40% of image area by default)
-        if len(approx) == 4 and cv2.contourArea(approx) > area_threshold_ratio * img_area:
-            # Found our document! Convert to simple 4-point format
-            screenCnt = approx.reshape(4, 2)
+        # 2. Must still be large enough once simplified to those 4 corners
+        if len(approx) == 4 and cv2.contourArea(approx) > min_area:
+            # Found our document! Convert to simple 4-point format and
+            # scale the corners back up to full-resolution coordinates
+            # (per axis: the thumbnail's width and height are each rounded
+            # to whole pixels, so x and y don't shrink by exactly `scale`)
+            screenCnt = approx.reshape(4, 2) * (img_width / small.shape[1],
+                                                img_height / small.shape[0])
             break  # Stop looking, we found it!
     
     # =================================================================
     # STEP 3: STRAIGHTEN THE DOCUMENT
     # =================================================================
     
+    # A straight document only needs cropping. The corners come from the
+    # thumbnail, so allow them a couple of thumbnail pixels of jitter
+    box = None
     if screenCnt is not None:
+        box = axis_aligned_box(screenCnt, img_width, img_height, tolerance=2 * scale)
+    
+    if box is not None:
+        # The document is already straight (typical for flatbed scans) -
+        # cut it out as a view of the image, no pixels are copied
+        x0, y0, x1, y1 = box
+        warped = image[y0:y1 + 1, x0:x1 + 1]
+    elif screenCnt is not None:
         # We found a document contour - straighten it!
         # This transforms the crooked quadrilateral into a perfect rectangle
         warped = four_point_transform(image, screenCnt)
@@ -295,15 +497,32 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     # STEP 4: ENHANCE IMAGE QUALITY
     # =================================================================
     
-    # Upscale the image for better quality
-    # fx, fy = scaling factors for width and height
-    # INTER_CUBIC = high-quality interpolation (smooth scaling)
-    upscaled = cv2.resize(warped, (0, 0), fx=upscale_factor, fy=upscale_factor,
-                         interpolation=cv2.INTER_CUBIC)
+    # The straightened page is already grayscale (see STEP 1)
+    gray = warped
+    warped_height, warped_width = gray.shape
     
-    # Convert to grayscale for black-and-white processing
-    # This removes color information, focusing on text and content
-    gray = cv2.cvtColor(upscaled, cv2.COLOR_BGR2GRAY)
+    # With a CUDA-capable OpenCV build and an NVIDIA GPU, the two heaviest
+    # steps (upscale + threshold) can run on the GPU instead (opt-in, see
+    # USE_CUDA) - see STEP 5 below for what they do
+    if USE_CUDA:
+        return upscale_and_threshold_cuda(gray, upscale_factor)
+    # Without CUDA, any OpenCL GPU can do the same (opt-in, see USE_OPENCL)
+    if USE_OPENCL:
+        return upscale_and_threshold_opencl(gray, upscale_factor)
+    
+    # Upscale the image for better quality
+    # dsize = (width, height) of the result: upscale_factor times larger
+    # INTER_LINEAR = bilinear interpolation (2x2 neighborhood, 4 taps per pixel)
+    # Bicubic (4x4, 16 taps) is 4x the work for smoothness that the
+    # thresholding below throws away anyway. On uint8 input OpenCV already
+    # does this in fixed-point integers (INTER_LINEAR_EXACT measured slower,
+    # and cv2.pyrUp for 2x was within noise while adding a Gaussian blur)
+    if upscale_factor != 1:
+        up_width = warped_width * upscale_factor
+        up_height = warped_height * upscale_factor
+        gray = cv2.resize(gray, (up_width, up_height),
+                          dst=scratch_buffer('upscaled', (up_height, up_width)),
+                          interpolation=cv2.INTER_LINEAR)
     
     # =================================================================
     # STEP 5: CREATE HIGH-CONTRAST BLACK AND WHITE OUTPUT
@@ -312,10 +531,17 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
     # Apply adaptive thresholding for professional black-and-white look
     # This automatically adjusts the threshold for different parts of the image
     # Perfect for handling uneven lighting or shadows!
+    # ADAPTIVE_THRESH_MEAN_C uses a plain box average of the neighborhood,
+    # which OpenCV computes with running sums - the cost per pixel stays the
+    # same no matter how large blockSize is. That is already the Bradley-Roth
+    # threshold (mean - C); rebuilding it from cv2.integral + NumPy slicing
+    # measured ~4x slower on a full page
+    # (Sauvola via cv2.ximgproc.niBlackThreshold also needs the local standard
+    # deviation and measured ~9x slower than this on a full page)
     binary = cv2.adaptiveThreshold(
         gray,                           # Input grayscale image
         255,                           # Maximum value (pure white)
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C, # Use Gaussian-weighted neighborhood
+        cv2.ADAPTIVE_THRESH_MEAN_C,    # Use mean of the neighborhood
         cv2.THRESH_BINARY,             # Binary output (black or white only)
         blockSize=91,                  # Size of neighborhood area (must be odd)
                                       # Larger = smoother, smaller = more detail
@@ -330,6 +556,76 @@ def process_image_cv(image, area_threshold_ratio=0.4, upscale_factor=2):
 # PDF CREATION AND OUTPUT
 # =============================================================================
 
+def encode_page(img, bilevel=False):
+    """
+    🔥 COMPRESSES ONE PROCESSED PAGE INTO PNG BYTES
+    
+    PNG keeps grayscale pages single-channel and is lossless, so PyMuPDF can
+    later store black-and-white pages at 1 bit per pixel. The encoded page is
+    also tiny compared to the raw array, which makes it cheap to send back
+    from a worker process. This is the only time a page gets encoded - the
+    PNG goes straight into the PDF.
+    
+    Args:
+        img (numpy.array): Processed page, grayscale or RGB
+        bilevel (bool): True if the page is pure black and white (0/255),
+                        like process_image_cv() output - it is then written
+                        as a 1-bit PNG, which is about twice as fast to encode
+                        and to put into the PDF. Other gray levels would be
+                        rounded to black or white, so leave it off otherwise
+    
+    Returns:
+        bytes: The page as a PNG file
+    """
+    # OpenCV expects BGR order when encoding color images
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    
+    params = [cv2.IMWRITE_PNG_BILEVEL, 1] if bilevel else []
+    
+    # Encoding runs in C, no per-pixel Python work
+    ok, png = cv2.imencode('.png', img, params)
+    if not ok:
+        raise Exception("Failed to encode page image.")
+    return png.tobytes()
+
+def encoded_pages_to_pdf(png_pages, output_pdf_path):
+    """
+    🔥 COMBINES ENCODED PAGES INTO A SINGLE PDF FILE
+    
+    Args:
+        png_pages (list): One PNG (bytes) per page, e.g. from encode_page()
+        output_pdf_path (str or file): Full path where the final PDF should be saved,
+                                       or a writable binary file object (e.g. io.BytesIO)
+    
+    Raises:
+        Exception: If no pages are provided (nothing to save)
+    """
+    # Safety check - make sure we have pages to work with
+    if not png_pages:
+        raise Exception("No images were processed to save.")
+    
+    # Build the PDF directly with PyMuPDF (already used to read the input)
+    with _fitz_lock:
+        doc = fitz.open()
+        
+        try:
+            for png in png_pages:
+                # One point per pixel, same page size as the image
+                # (read from the PNG header instead of decoding the whole image)
+                width = int.from_bytes(png[16:20], 'big')
+                height = int.from_bytes(png[20:24], 'big')
+                page = doc.new_page(width=width, height=height)
+                page.insert_image(page.rect, stream=png)
+            del page
+            
+            # Save the multi-page PDF
+            # garbage=4 drops duplicate images (e.g. repeated blank pages)
+            # deflate=True compresses everything that is not compressed yet
+            doc.save(output_pdf_path, garbage=4, deflate=True)
+        finally:
+            doc.close()
+
 def images_to_pdf_from_arrays(images, output_pdf_path):
     """
     🔥 CONVERTS PROCESSED IMAGES BACK INTO A SINGLE PDF FILE
@@ -340,68 +636,291 @@ def images_to_pdf_from_arrays(images, output_pdf_path):
     Args:
         images (list): List of numpy arrays representing processed document pages
                       Each array should be a grayscale or RGB image
-        output_pdf_path (str): Full path where the final PDF should be saved
+        output_pdf_path (str or file): Full path where the final PDF should be saved,
+                                       or a writable binary file object (e.g. io.BytesIO)
     
     Raises:
-        gr.Error: If no images are provided (nothing to save)
+        Exception: If no images are provided (nothing to save)
     
     Process:
-        1. Convert numpy arrays to PIL Image objects
-        2. Ensure all images are in RGB format (required for PDF)
-        3. Use the first image as the base and append the rest
-        4. Save as a multi-page PDF file
+        1. Encode each page as PNG (see encode_page)
+        2. Add one PDF page per image, sized 1 pt per pixel
+        3. Save as a multi-page PDF file
     """
-    # Safety check - make sure we have images to work with
-    if not images:
-        raise Exception("No images were processed to save.")
+    encoded_pages_to_pdf([encode_page(img) for img in images], output_pdf_path)
+
+# =============================================================================
+# PARALLEL PAGE PROCESSING
+# Every page goes through process_image_cv independently, so a multi-page PDF
+# can keep all CPU cores busy by handing pages to a pool of worker processes
+# =============================================================================
+
+# Shared pool of page workers, created on first use and reused across calls
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _init_page_worker():
+    """
+    🔥 PREPARES A WORKER PROCESS FOR PAGE PROCESSING
+    
+    Each worker already runs one page per core, so OpenCV's own thread pool
+    is limited to a single thread to avoid oversubscribing the CPU.
+    
+    It also renders a tiny throwaway page once: MuPDF builds its shared
+    rendering state (colorspaces, font cache) lazily, and that one-time cost
+    would otherwise land on the first real page this worker gets. The worker
+    lives on across requests, so everything stays warm afterwards.
+    """
+    cv2.setNumThreads(1)
+    
+    doc = fitz.open()
+    page = doc.new_page(width=72, height=72)
+    page.insert_text((10, 40), "Warm up")
+    page.get_pixmap(dpi=72, colorspace=fitz.csGRAY, alpha=False)
+    doc.close()
+
+def available_cpus():
+    """
+    🔥 NUMBER OF CPU CORES THIS PROCESS MAY ACTUALLY RUN ON
+    
+    os.cpu_count() reports every core of the host, even inside a container
+    pinned to a few of them. The CPU affinity mask (Linux) only lists the
+    cores we are allowed to use.
+    
+    Returns:
+        int: Usable CPU cores (at least 1)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+def page_pool_size():
+    """
+    🔥 NUMBER OF WORKER PROCESSES IN THE PAGE POOL
+    
+    Returns:
+        int: All usable CPU cores, or cores / WEB_CONCURRENCY when the API
+             runs several uvicorn workers
+    """
+    web_workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    return max(1, available_cpus() // web_workers)
+
+def get_page_pool():
+    """
+    🔥 RETURNS THE SHARED PAGE-PROCESSING POOL
+    
+    The pool gets an equal share of the CPU cores: all of them for a single
+    process, or cores / WEB_CONCURRENCY when the API runs several uvicorn
+    workers (each with its own pool). Workers are started with 'spawn' so they
+    never inherit locks held by threads of the web server.
+    
+    Returns:
+        ProcessPoolExecutor: Pool used to run process_image_cv on pages
+    """
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=page_pool_size(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_page_worker
+            )
+        return _page_pool
+
+def _discard_page_pool(pool):
+    """
+    🔥 THROWS AWAY A BROKEN PAGE POOL
+    
+    When a worker process dies (killed for using too much memory, or crashed
+    by a bad PDF), the whole ProcessPoolExecutor becomes unusable. Forgetting
+    it makes the next get_page_pool() call start a fresh one.
+    
+    Args:
+        pool (ProcessPoolExecutor): The pool that broke
+    """
+    global _page_pool
+    with _page_pool_lock:
+        # Another request may already have replaced it
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def start_page_pool():
+    """
+    🔥 STARTS EVERY PAGE WORKER AHEAD OF TIME
+    
+    The pool only spawns worker processes when work arrives, so the first
+    multi-page PDF would wait for Python, OpenCV and PyMuPDF to load in each
+    of them. Calling this at server startup gets that out of the way.
+    
+    Does nothing when the pool would only have one worker: enhance_pdf()
+    then processes pages inline and never uses the pool.
+    """
+    if page_pool_size() <= 1:
+        return
+    
+    pool = get_page_pool()
+    # One trivial task per worker makes the pool spawn all of them
+    for future in [pool.submit(os.getpid) for _ in range(page_pool_size())]:
+        future.result()
+
+def shutdown_page_pool():
+    """
+    🔥 STOPS THE PAGE WORKERS
+    
+    Called at server shutdown so the worker processes exit cleanly.
+    """
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown()
+        _page_pool = None
+
+def enhance_page_range(pdf_source, start, stop, dpi=200):
+    """
+    🔥 RENDERS, PROCESSES AND ENCODES A RANGE OF PDF PAGES
+    
+    Runs inside a pool worker. Each worker opens its own copy of the PDF -
+    PyMuPDF documents can't be shared between threads or processes - so
+    rendering, the most expensive step at high DPI, runs in parallel too.
+    Only the compressed result travels back to the main process.
     
-    # Convert all numpy arrays to PIL Images and ensure RGB format
-    # PIL (Python Imaging Library) is needed for PDF creation
-    # convert('RGB') ensures consistent color format even for grayscale images
-    pil_images = [Image.fromarray(img).convert('RGB') for img in images]
+    Args:
+        pdf_source (str or bytes): Path to the PDF file, or its raw bytes
+        start (int): Index of the first page
+        stop (int): Index after the last page
+        dpi (int): Scan quality setting (default: 200)
     
-    # Create the multi-page PDF
-    # The first image becomes the base, and we append all others to it
-    # save_all=True enables multi-page PDF creation
-    # append_images contains all pages after the first one
-    pil_images[0].save(output_pdf_path, save_all=True, append_images=pil_images[1:])
+    Returns:
+        list: One PNG (bytes) per processed page, in page order
+    """
+    doc = open_pdf(pdf_source)
+    try:
+        return [encode_page(process_image_cv(img), bilevel=True)
+                for img in iter_pdf_pages(doc, dpi, start, stop)]
+    finally:
+        close_pdf(doc)
+
+def enhance_pages_in_pool(pdf_source, page_count, dpi=200):
+    """
+    🔥 SPREADS THE PAGES OF A PDF OVER THE WORKER POOL
+    
+    The PDF is split into one contiguous range of pages per worker, so every
+    worker opens the PDF once (not once per page) and renders its pages
+    itself. PDFs held in memory are passed to the workers as a temporary
+    file, so their bytes are not copied into every worker.
+    
+    Args:
+        pdf_source (str or bytes): Path to the PDF file, or its raw bytes
+        page_count (int): Number of pages in the PDF
+        dpi (int): Scan quality setting (default: 200)
+    
+    Returns:
+        list: One PNG (bytes) per processed page, in page order
+    """
+    chunks = min(page_count, page_pool_size())
+    bounds = [page_count * k // chunks for k in range(chunks + 1)]
+    
+    # Every submit pickles its arguments, so PDF bytes would be copied into
+    # each worker - spill them to a temp file once and hand out the path
+    temp_path = None
+    if isinstance(pdf_source, bytes):
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(pdf_source)
+        pdf_source = temp_path
+    
+    try:
+        # A dead worker breaks the whole pool - replace it and try once more,
+        # so one crash doesn't fail every later request
+        for attempt in range(2):
+            pool = get_page_pool()
+            try:
+                futures = [
+                    pool.submit(enhance_page_range, pdf_source, start, stop, dpi)
+                    for start, stop in zip(bounds, bounds[1:])
+                ]
+                
+                # Collect the ranges back in page order
+                return [png for future in futures for png in future.result()]
+            except BrokenProcessPool:
+                _discard_page_pool(pool)
+                if attempt == 1:
+                    raise
+    finally:
+        # Only remove the file we created - a path from the caller is theirs
+        if temp_path is not None:
+            os.unlink(temp_path)
 
 # =============================================================================
 # MAIN PROCESSING FUNCTION FOR FASTAPI
 # =============================================================================
 
-def enhance_pdf_from_path(pdf_path, output_path, dpi=200):
+def enhance_pdf(pdf_source, dpi=200):
     """
     🔥 MAIN ORCHESTRATION FUNCTION FOR FASTAPI
     
     This is the main function that coordinates the entire PDF pimping process
-    when called from the FastAPI interface. It handles the complete workflow
-    from input PDF file to enhanced output.
+    when called from the FastAPI interface. The enhanced PDF is built in
+    memory and returned as bytes - no output file is written to disk.
     
     Args:
-        pdf_path (str): Path to the input PDF file
-        output_path (str): Path where the enhanced PDF should be saved
+        pdf_source (str or bytes): Path to the input PDF file, or its raw bytes
         dpi (int): Scan quality setting (default: 200)
     
     Returns:
-        str: Path to the enhanced PDF file
+        bytes: The enhanced PDF
     
     Workflow:
-        1. Convert PDF pages to images
-        2. Process each image (detect, straighten, enhance)
+        1. Convert PDF pages to images, one at a time
+        2. Process each image (detect, straighten, enhance) - in parallel,
+           each worker rendering its own pages
         3. Combine processed images back into a PDF
-        4. Return the output path
+        4. Return the PDF bytes
     """
     # STEP 1: Convert PDF to individual page images
-    # This breaks down the PDF into separate images we can process
-    images = pdf_to_images_in_memory(pdf_path, dpi)
-
     # STEP 2: Process each page image through our pimping pipeline
     # Each image gets: document detection → straightening → enhancement
-    processed_images = [process_image_cv(img) for img in images]
+    # Pages are independent, so multi-page PDFs are spread across all cores
+    # (rendering included). A single page - or a pool that would only have
+    # one worker, e.g. one uvicorn worker per core - is done right here:
+    # shipping the PDF to one other process would only add overhead
+    use_pool = page_pool_size() > 1
+    doc = open_pdf(pdf_source)
+    try:
+        page_count = pdf_page_count(doc)
+        if page_count <= 1 or not use_pool:
+            png_pages = [encode_page(process_image_cv(img), bilevel=True)
+                         for img in iter_pdf_pages(doc, dpi)]
+    finally:
+        # Close the PDF document to free memory
+        close_pdf(doc)
+    
+    if page_count > 1 and use_pool:
+        png_pages = enhance_pages_in_pool(pdf_source, page_count, dpi)
 
     # STEP 3: Combine all processed images back into a single PDF
-    images_to_pdf_from_arrays(processed_images, output_path)
+    output = io.BytesIO()
+    encoded_pages_to_pdf(png_pages, output)
+    
+    # Return the PDF bytes
+    return output.getvalue()
+
+def enhance_pdf_from_path(pdf_path, output_path, dpi=200):
+    """
+    🔥 ENHANCES A PDF FILE AND SAVES THE RESULT TO DISK
+    
+    Same as enhance_pdf(), but writes the enhanced PDF to a file.
+    
+    Args:
+        pdf_path (str): Path to the input PDF file
+        output_path (str): Path where the enhanced PDF should be saved
+        dpi (int): Scan quality setting (default: 200)
+    
+    Returns:
+        str: Path to the enhanced PDF file
+    """
+    with open(output_path, 'wb') as output_file:
+        output_file.write(enhance_pdf(pdf_path, dpi))
     
     # Return the output path
     return output_path
\ No newline at end of file